@@ -1,5 +1,8 @@
+import os
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
+
+from .utils import file_ext
 
 # Very lightweight magic-byte checks
 MAGIC = {
@@ -11,6 +14,13 @@ MAGIC = {
     "gif": b"GIF8"
 }
 
+# Dispatch on the first header byte so detection is one dict lookup.
+# Signatures sharing a first byte keep MAGIC's order within their bucket.
+_MAGIC_BY_FIRST: Dict[int, Tuple[Tuple[str, bytes], ...]] = {}
+for _t, _sig in MAGIC.items():
+    _MAGIC_BY_FIRST[_sig[0]] = _MAGIC_BY_FIRST.get(_sig[0], ()) + ((_t, _sig),)
+del _t, _sig
+
 EXT_EXPECTATIONS = {
     ".exe": "pe",
     ".dll": "pe",
@@ -29,9 +39,9 @@ EXT_EXPECTATIONS = {
 }
 
 
-def read_header(path: Path, size: int = 16) -> Optional[bytes]:
+def read_header(path: Union[str, Path], size: int = 16) -> Optional[bytes]:
     try:
-        with path.open("rb") as f:
+        with open(path, "rb") as f:
             return f.read(size)
     except Exception:
         return None
@@ -41,7 +51,7 @@ def detect_magic_type(header: bytes) -> Optional[str]:
     if not header:
         return None
 
-    for t, sig in MAGIC.items():
+    for t, sig in _MAGIC_BY_FIRST.get(header[0], ()):
         if header.startswith(sig):
             return t
     return None
@@ -51,16 +61,24 @@ def expected_type_for_extension(ext: str) -> Optional[str]:
     return EXT_EXPECTATIONS.get(ext.lower())
 
 
-def extension_header_mismatch(path: Path) -> Tuple[bool, Optional[str], Optional[str]]:
+def extension_header_mismatch(
+    path: Union[str, Path],
+    header: Optional[bytes] = None,
+    ext: Optional[str] = None
+) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Returns (mismatch, expected_type, actual_type)
+    Pass header if it was already read to skip reopening the file,
+    and ext (lowercased suffix) if already computed.
     """
-    ext = path.suffix.lower()
+    if ext is None:
+        ext = file_ext(os.fspath(path))
     expected = expected_type_for_extension(ext)
     if not expected:
         return (False, None, None)
 
-    header = read_header(path)
+    if header is None:
+        header = read_header(path)
     if header is None:
         return (False, expected, None)
 
@@ -1,21 +1,147 @@
 import hashlib
+import io
+import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 
+from .utils import MMAP_MAX_SIZE, MMAP_MIN_SIZE, mmap_window
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> Optional[str]:
+
+HASH_BUF_SIZE = 8 * 1024 * 1024
+
+# Worker threads each keep a smaller buffer so a wide pool stays cheap
+WORKER_BUF_SIZE = 1024 * 1024
+
+# Python 3.11+ hashes a file object without Python-level chunk handling
+# (OpenSSL picks SHA-NI/ARMv8 SHA when the CPU has it). Set
+# LFAV_DISABLE_FILE_DIGEST=1 to force the readinto loop for A/B timing.
+USE_FILE_DIGEST = (
+    hasattr(hashlib, "file_digest")
+    and not os.environ.get("LFAV_DISABLE_FILE_DIGEST")
+)
+
+# Files above this have their cached pages dropped once read (see
+# _SequentialFile); smaller ones are left to the kernel's normal LRU
+EVICT_MIN_SIZE = MMAP_MAX_SIZE
+
+_HASH_BUF = bytearray(HASH_BUF_SIZE)
+_local = threading.local()
+
+
+def read_buffer() -> bytearray:
+    """
+    Per-thread scratch buffer for readinto loops. Not re-entrant: callers
+    must be done with it before the next read_buffer() on the same thread.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return _HASH_BUF
+    buf = getattr(_local, "buf", None)
+    if buf is None:
+        buf = _local.buf = bytearray(WORKER_BUF_SIZE)
+    return buf
+
+
+class _SequentialFile(io.FileIO):
+    """
+    FileIO that drops the file's pages from the cache on close
+    (POSIX_FADV_DONTNEED). This evicts them for every process, not just
+    this one, so open_sequential only uses it for files larger than
+    EVICT_MIN_SIZE, where a single read would otherwise flush a large
+    share of the cache.
+    """
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                os.posix_fadvise(self.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+        super().close()
+
+
+def open_sequential(path: Union[str, Path]) -> BinaryIO:
+    """
+    Open a file unbuffered for one front-to-back read.
+    On Linux this skips atime updates (O_NOATIME), asks for aggressive
+    readahead (POSIX_FADV_SEQUENTIAL) and, for files above EVICT_MIN_SIZE,
+    drops the cached pages when it is closed (see _SequentialFile);
+    elsewhere it is a plain open.
+    Close any mapping of the file before closing the file.
+    """
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+    noatime = getattr(os, "O_NOATIME", 0)
+    try:
+        fd = os.open(path, flags | noatime)
+    except PermissionError:
+        if not noatime:
+            raise
+        # O_NOATIME is refused (EPERM) on files we do not own
+        fd = os.open(path, flags)
+
+    file_cls = io.FileIO
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if os.fstat(fd).st_size > EVICT_MIN_SIZE:
+                file_cls = _SequentialFile
+    except OSError:
+        pass
+
+    try:
+        return file_cls(fd, "rb")
+    except Exception:
+        os.close(fd)
+        raise
+
+
+def sha256_fileobj(
+    f: BinaryIO,
+    size: Optional[int] = None,
+    use_mmap: bool = False
+) -> bytes:
+    """
+    Raw SHA-256 digest of an open binary file, hashed from the start and
+    rewound afterwards so the caller can keep using the same descriptor.
+    Errors are raised.
+
+    With use_mmap, mid-size files (MMAP_MIN_SIZE..MMAP_MAX_SIZE) are hashed
+    from a mapping in one update; the rest use hashlib.file_digest when
+    available (see USE_FILE_DIGEST), else a readinto loop over read_buffer().
+    """
+    if size is None:
+        size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    try:
+        if use_mmap and MMAP_MIN_SIZE <= size <= MMAP_MAX_SIZE:
+            with mmap_window(f, 0) as mv:
+                if mv is not None:
+                    return hashlib.sha256(mv).digest()
+
+        if USE_FILE_DIGEST:
+            return hashlib.file_digest(f, "sha256").digest()
+
+        buf = read_buffer()
+        mv = memoryview(buf)
+        h = hashlib.sha256()
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+        return h.digest()
+    finally:
+        f.seek(0)
+
+
+def sha256_file(path: Union[str, Path]) -> Optional[str]:
     """
     Compute SHA-256 of a file. Returns hex digest or None on failure.
+    A thin wrapper over sha256_fileobj.
     """
-    h = hashlib.sha256()
     try:
-        with path.open("rb") as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                h.update(chunk)
-        return h.hexdigest()
+        with open_sequential(path) as f:
+            return sha256_fileobj(f).hex()
     except (PermissionError, FileNotFoundError, IsADirectoryError):
         return None
     except Exception:
@@ -1,56 +1,136 @@
 import math
+import os
+import re
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, NamedTuple, Tuple, Optional, Union
 
-from .utils import has_double_extension
+from .utils import file_ext, has_double_extension
 from .filetype_checks import extension_header_mismatch
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to the pure-Python loop
+    np = None
 
-SUSPICIOUS_EXTENSIONS = {
+try:
+    from numba import njit
+except ImportError:  # Numba is optional (and needs NumPy); bincount is used instead
+    njit = None
+
+if njit is not None and np is not None:
+    @njit(cache=True)
+    def _byte_histogram_nb(arr, counts):
+        for b in arr:
+            counts[b] += 1
+        return counts
+else:
+    _byte_histogram_nb = None
+
+# False means entropy runs as a Python loop and holds the GIL
+VECTORIZED_ENTROPY = np is not None
+
+
+SUSPICIOUS_EXTENSIONS = frozenset({
     ".exe", ".scr", ".js", ".vbs", ".bat", ".cmd", ".ps1", ".dll", ".jar"
-}
+})
 
 # Extensions commonly used in masquerading chains
 ""
-BENIGN_DOC_LIKE = {
+BENIGN_DOC_LIKE = frozenset({
     ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".txt", ".rtf"
-}
+})
 
+# Common "urgency" bait terms and the script/executable extensions they pair with
+_BAIT_RE = re.compile(r"invoice|urgent|payment|security|update|scan|statement")
+_EXE_RE = re.compile(r"\.(?:exe|scr|js|vbs|ps1|bat)(?:$|\.)")
 
-def shannon_entropy(data: bytes) -> float:
-    if not data:
-        return 0.0
-    freq = [0] * 256
+
+def byte_histogram(data, counts=None):
+    """
+    Count byte values in data, optionally adding onto an earlier histogram.
+    Returns a 256-bin NumPy array when NumPy is available, else a list.
+    Uses a Numba-compiled loop when Numba is installed, then NumPy's
+    bincount, then plain Python.
+    """
+    if _byte_histogram_nb is not None:
+        start = np.zeros(256, dtype=np.int64) if counts is None else counts.astype(np.int64)
+        return _byte_histogram_nb(np.frombuffer(data, dtype=np.uint8), start)
+
+    if np is not None:
+        hist = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        return hist if counts is None else counts + hist
+
+    freq = counts if counts is not None else [0] * 256
     for b in data:
         freq[b] += 1
+    return freq
+
+
+def entropy_from_counts(counts, length: int) -> float:
+    if not length:
+        return 0.0
+    if np is not None:
+        counts = np.asarray(counts, dtype=np.float64)
+        nz = counts[counts > 0]
+        p = nz / length
+        # log2(1/p) rather than -log2(p) so a single-value input gives 0.0, not -0.0
+        return float(np.dot(p, np.log2(1.0 / p)))
+
     ent = 0.0
-    length = len(data)
-    for c in freq:
+    for c in counts:
         if c:
             p = c / length
             ent -= p * math.log2(p)
     return ent
 
 
-def file_entropy(path: Path, max_bytes: int = 1024 * 1024) -> Optional[float]:
+def shannon_entropy(data: bytes) -> float:
+    if not data:
+        return 0.0
+    return entropy_from_counts(byte_histogram(data), len(data))
+
+
+def file_entropy(path: Union[str, Path], max_bytes: int = 1024 * 1024) -> Optional[float]:
     """
     Compute entropy over up to max_bytes for speed.
     """
     try:
-        with path.open("rb") as f:
+        with open(path, "rb") as f:
             data = f.read(max_bytes)
         return shannon_entropy(data)
     except Exception:
         return None
 
 
-def hidden_like_name_score(name: str) -> Tuple[int, List[str]]:
+class NameInfo(NamedTuple):
+    """
+    Filename views shared by the name heuristics, computed once per file.
+    """
+    name: str
+    lower: str
+    ext: str
+    double_extension: bool
+
+
+def name_info(path: Union[str, Path]) -> NameInfo:
+    name = os.path.basename(path)
+    lower = name.lower()
+    return NameInfo(
+        name=name,
+        lower=lower,
+        ext=file_ext(name),
+        double_extension=has_double_extension(name)
+    )
+
+
+def hidden_like_name_score(info: NameInfo) -> Tuple[int, List[str]]:
     """
     Very simple, explainable naming checks.
     """
     reasons = []
     score = 0
-    lower = name.lower()
+    name = info.name
+    lower = info.lower
 
     # Lots of dots can be suspicious
     dot_count = lower.count(".")
@@ -64,25 +144,22 @@ def hidden_like_name_score(name: str) -> Tuple[int, List[str]]:
         reasons.append("Filename has leading/trailing whitespace.")
 
     # Common "urgency" bait terms (lightweight, non-judgmental)
-    bait_terms = ("invoice", "urgent", "payment", "security", "update", "scan", "statement")
-    if any(t in lower for t in bait_terms) and any(ext in lower for ext in (".exe", ".scr", ".js", ".vbs", ".ps1", ".bat")):
+    if _BAIT_RE.search(lower) and _EXE_RE.search(lower):
         score += 6
         reasons.append("Filename contains common lure terms combined with a script/executable extension.")
 
     return score, reasons
 
 
-def double_extension_score(filename: str, ext: str) -> Tuple[int, List[str]]:
+def double_extension_score(info: NameInfo) -> Tuple[int, List[str]]:
     reasons = []
     score = 0
-    lower = filename.lower()
 
-    if has_double_extension(filename):
+    if info.double_extension:
         # Look for doc-like + executable pattern anywhere in chain
-        parts = lower.split(".")
-        # rebuild extensions list ignoring base name
-        exts = ["." + p for p in parts[1:]]
-        if any(e in BENIGN_DOC_LIKE for e in exts) and any(e in SUSPICIOUS_EXTENSIONS for e in exts):
+        # rebuild extensions set ignoring base name
+        exts = {"." + p for p in info.lower.split(".")[1:]}
+        if not exts.isdisjoint(BENIGN_DOC_LIKE) and not exts.isdisjoint(SUSPICIOUS_EXTENSIONS):
             score += 25
             reasons.append("Possible double-extension masquerading (e.g., document name ending with executable/script).")
         else:
@@ -98,29 +175,48 @@ def suspicious_extension_score(ext: str) -> Tuple[int, List[str]]:
     return 0, []
 
 
-def header_mismatch_score(path: Path) -> Tuple[int, List[str]]:
-    mismatch, expected, actual = extension_header_mismatch(path)
+def header_mismatch_score(
+    path: Union[str, Path],
+    header: Optional[bytes] = None,
+    ext: Optional[str] = None
+) -> Tuple[int, List[str]]:
+    mismatch, expected, actual = extension_header_mismatch(path, header, ext)
     if mismatch:
         return 30, [f"Extension/header mismatch: expected {expected}, found {actual}."]
     return 0, []
 
 
-def entropy_score(path: Path, threshold: float = 7.2) -> Tuple[int, List[str]]:
+def entropy_score(
+    path: Union[str, Path],
+    threshold: float = 7.2,
+    ent: Optional[float] = None
+) -> Tuple[int, List[str], Optional[float]]:
     """
     Entropy threshold is intentionally conservative and explainable.
     High entropy can indicate packing/encryption/obfuscation.
+    Also returns the entropy value (None if the file could not be read).
     """
-    ent = file_entropy(path)
     if ent is None:
-        return 0, []
+        ent = file_entropy(path)
+    if ent is None:
+        return 0, [], None
 
     if ent >= threshold:
-        return 18, [f"High entropy ({ent:.2f}) may indicate packing or obfuscation."]
-    return 0, []
+        return 18, [f"High entropy ({ent:.2f}) may indicate packing or obfuscation."], ent
+    return 0, [], ent
 
 
-def evaluate_heuristics(path: Path, enable_entropy: bool = True) -> Dict:
+def evaluate_heuristics(
+    path: Union[str, Path],
+    enable_entropy: bool = True,
+    precomputed: Optional[Dict] = None,
+    info: Optional[NameInfo] = None
+) -> Dict:
     """
+    precomputed may carry "header" and "entropy" from an earlier
+    single-pass read (see streaming.scan_file_streaming).
+    info is the file's NameInfo if the caller already built one.
+
     Returns:
       {
         "risk_score": int,
@@ -130,33 +226,33 @@ def evaluate_heuristics(path: Path, enable_entropy: bool = True) -> Dict:
     """
     reasons: List[str] = []
     score = 0
+    pre = precomputed or {}
 
-    filename = path.name
-    ext = path.suffix.lower()
+    if info is None:
+        info = name_info(path)
+    ext = info.ext
 
     s, r = suspicious_extension_score(ext)
     score += s
     reasons += r
 
-    s, r = double_extension_score(filename, ext)
+    s, r = double_extension_score(info)
     score += s
     reasons += r
 
-    s, r = hidden_like_name_score(filename)
+    s, r = hidden_like_name_score(info)
     score += s
     reasons += r
 
-    s, r = header_mismatch_score(path)
+    s, r = header_mismatch_score(path, pre.get("header"), ext)
     score += s
     reasons += r
 
     ent_val = None
     if enable_entropy:
-        s, r = entropy_score(path)
+        s, r, ent_val = entropy_score(path, ent=pre.get("entropy"))
         score += s
         reasons += r
-        # recompute once for reporting if needed
-        ent_val = file_entropy(path)
 
     # Cap at 99 for heuristic-only
     if score > 99:
@@ -1,33 +1,77 @@
 import json
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from .json_codec import dumps_bytes, loads
 from .utils import get_data_dir
 
 
 def history_path() -> Path:
+    return get_data_dir() / "scan_history.jsonl"
+
+
+def legacy_history_path() -> Path:
+    # Pre-JSONL format: one JSON array rewritten on every append
     return get_data_dir() / "scan_history.json"
 
 
+def _encode_line(record: Dict[str, Any]) -> bytes:
+    # Bytes go straight to the file, no text layer
+    return dumps_bytes(record) + b"\n"
+
+
+def migrate_legacy_history() -> None:
+    """
+    One-shot conversion of scan_history.json (array) into JSON Lines.
+    The legacy file is kept as scan_history.json.bak.
+    """
+    legacy = legacy_history_path()
+    if not legacy.exists() or history_path().exists():
+        return
+    try:
+        data = json.loads(legacy.read_text(encoding="utf8"))
+    except Exception:
+        data = []
+    if not isinstance(data, list):
+        data = []
+
+    history_path().write_bytes(b"".join(_encode_line(rec) for rec in data if isinstance(rec, dict)))
+    legacy.replace(legacy.with_name(legacy.name + ".bak"))
+
+
 def ensure_history_file() -> None:
+    migrate_legacy_history()
     p = history_path()
     if not p.exists():
-        p.write_text("[]", encoding="utf8")
+        p.write_text("", encoding="utf8")
 
 
-def read_history() -> List[Dict[str, Any]]:
+def read_history(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Returns records oldest first; limit keeps only the last N.
+    Unparseable lines (e.g. a torn final write) are skipped.
+    """
     ensure_history_file()
-    p = history_path()
+    out = deque(maxlen=limit) if limit else []
     try:
-        data = json.loads(p.read_text(encoding="utf8"))
-        return data if isinstance(data, list) else []
+        with history_path().open("rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, dict):
+                    out.append(rec)
     except Exception:
-        p.write_text("[]", encoding="utf8")
         return []
+    return list(out)
 
 
 def append_history(record: Dict[str, Any]) -> None:
     ensure_history_file()
-    data = read_history()
-    data.append(record)
-    history_path().write_text(json.dumps(data, indent=2), encoding="utf8")
+    with history_path().open("ab") as f:
+        f.write(_encode_line(record))
@@ -1,85 +1,243 @@
 import sqlite3
 import json
+import threading
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
 from .utils import get_data_dir
 
 
+_CONN: Optional[sqlite3.Connection] = None
+_CONN_LOCK = threading.Lock()
+
+
 def db_path() -> Path:
     return get_data_dir() / "scan_history.db"
 
 
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            target TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            heuristics_enabled INTEGER NOT NULL,
+            storage TEXT NOT NULL,
+            files_scanned INTEGER NOT NULL,
+            flagged INTEGER NOT NULL,
+            report_json TEXT NOT NULL,
+            duration REAL
+        )
+    """)
+    # Databases created before per-file rows lack the duration column
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(scans)")}
+    if "duration" not in cols:
+        conn.execute("ALTER TABLE scans ADD COLUMN duration REAL")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+            path TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            status TEXT NOT NULL,
+            risk_score INTEGER NOT NULL,
+            reasons_json TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_files_sha ON files(sha256)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_files_scan ON files(scan_id)")
+    _migrate_report_blobs(conn)
+    conn.commit()
+
+
+def _migrate_report_blobs(conn: sqlite3.Connection) -> None:
+    """
+    Move results out of report_json blobs written before the files table
+    existed, so old scans read back like new ones. Blobs that don't parse
+    are left as they are.
+    """
+    legacy = conn.execute("SELECT id, report_json FROM scans WHERE report_json != ''").fetchall()
+    for scan_id, report_json in legacy:
+        try:
+            record = json.loads(report_json)
+        except Exception:
+            continue
+        if not isinstance(record, dict):
+            continue
+        conn.executemany(_INSERT_FILE, _file_rows(scan_id, record))
+        conn.execute(
+            "UPDATE scans SET report_json = '', duration = COALESCE(duration, ?) WHERE id = ?",
+            (record.get("duration"), scan_id)
+        )
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Shared connection for the process, opened lazily in WAL mode.
+    The schema is created once here rather than on every call.
+    """
+    global _CONN
+    with _CONN_LOCK:
+        if _CONN is None:
+            conn = sqlite3.connect(str(db_path()), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            # Off by default per connection; files rows cascade with their scan
+            conn.execute("PRAGMA foreign_keys=ON")
+            _create_schema(conn)
+            _CONN = conn
+        return _CONN
+
+
 def init_db() -> None:
-    p = db_path()
-    conn = sqlite3.connect(str(p))
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS scans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                target TEXT NOT NULL,
-                mode TEXT NOT NULL,
-                heuristics_enabled INTEGER NOT NULL,
-                storage TEXT NOT NULL,
-                files_scanned INTEGER NOT NULL,
-                flagged INTEGER NOT NULL,
-                report_json TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-    finally:
-        conn.close()
+    get_connection()
+
+
+def _scan_row(record: Dict[str, Any]) -> tuple:
+    summary = record.get("summary", {}) or {}
+    return (
+        record.get("timestamp", ""),
+        record.get("target", ""),
+        record.get("mode", ""),
+        1 if record.get("heuristics_enabled", False) else 0,
+        record.get("storage", "sqlite"),
+        int(summary.get("files_scanned", 0)),
+        int(summary.get("flagged", 0)),
+        # Per-file results live in the files table; nothing to blob here
+        "",
+        record.get("duration")
+    )
+
+
+def _file_rows(scan_id: int, record: Dict[str, Any]) -> Iterable[tuple]:
+    for r in record.get("results", []) or []:
+        yield (
+            scan_id,
+            r.get("path", ""),
+            (r.get("sha256") or "").lower(),
+            r.get("status", ""),
+            int(r.get("risk_score", 0)),
+            json.dumps(r.get("reasons", []) or [])
+        )
+
+
+_INSERT_SCAN = """
+    INSERT INTO scans (
+        timestamp, target, mode, heuristics_enabled, storage,
+        files_scanned, flagged, report_json, duration
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_FILE = """
+    INSERT INTO files (scan_id, path, sha256, status, risk_score, reasons_json)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _insert_record(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+    cur = conn.execute(_INSERT_SCAN, _scan_row(record))
+    conn.executemany(_INSERT_FILE, _file_rows(cur.lastrowid, record))
 
 
 def append_history(record: Dict[str, Any]) -> None:
-    init_db()
-    p = db_path()
-    conn = sqlite3.connect(str(p))
-    try:
-        cur = conn.cursor()
-        summary = record.get("summary", {}) or {}
-        cur.execute("""
-            INSERT INTO scans (
-                timestamp, target, mode, heuristics_enabled, storage,
-                files_scanned, flagged, report_json
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            record.get("timestamp", ""),
-            record.get("target", ""),
-            record.get("mode", ""),
-            1 if record.get("heuristics_enabled", False) else 0,
-            record.get("storage", "sqlite"),
-            int(summary.get("files_scanned", 0)),
-            int(summary.get("flagged", 0)),
-            json.dumps(record)
-        ))
-        conn.commit()
-    finally:
-        conn.close()
-
-
-def read_history() -> List[Dict[str, Any]]:
-    init_db()
-    p = db_path()
-    conn = sqlite3.connect(str(p))
+    conn = get_connection()
+    with _CONN_LOCK, conn:
+        _insert_record(conn, record)
+
+
+def _file_entry(row: tuple) -> Dict[str, Any]:
+    path, sha, status, score, reasons_json = row
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT report_json
+        reasons = json.loads(reasons_json)
+    except Exception:
+        reasons = []
+    return {
+        "path": path,
+        "sha256": sha,
+        "status": status,
+        "risk_score": score,
+        "reasons": reasons
+    }
+
+
+def read_history(limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    Latest scans first, as full reports (with "results") like the JSON
+    backend, plus the scan "id" for read_scan_results / find_by_sha256.
+    """
+    conn = get_connection()
+    with _CONN_LOCK:
+        rows = conn.execute("""
+            SELECT id, timestamp, target, mode, heuristics_enabled,
+                   storage, files_scanned, flagged, duration
             FROM scans
             ORDER BY id DESC
-            LIMIT 200
-        """)
-        rows = cur.fetchall()
-        out: List[Dict[str, Any]] = []
-        for (rj,) in rows:
-            try:
-                out.append(json.loads(rj))
-            except Exception:
-                continue
-        return out
-    finally:
-        conn.close()
+            LIMIT ?
+        """, (limit,)).fetchall()
+        # All file rows for these scans in one query, grouped below
+        results: Dict[int, List[Dict[str, Any]]] = {row[0]: [] for row in rows}
+        if results:
+            file_rows = conn.execute(f"""
+                SELECT scan_id, path, sha256, status, risk_score, reasons_json
+                FROM files
+                WHERE scan_id IN ({",".join("?" * len(results))})
+                ORDER BY id
+            """, list(results)).fetchall()
+            for row in file_rows:
+                results[row[0]].append(_file_entry(row[1:]))
+    out: List[Dict[str, Any]] = []
+    for (scan_id, ts, target, mode, heur, storage,
+         files_scanned, flagged, duration) in rows:
+        out.append({
+            "id": scan_id,
+            "timestamp": ts,
+            "target": target,
+            "mode": mode,
+            "heuristics_enabled": bool(heur),
+            "storage": storage,
+            "summary": {
+                "files_scanned": files_scanned,
+                "flagged": flagged
+            },
+            "duration": duration,
+            "results": results[scan_id]
+        })
+    return out
+
+
+def read_scan_results(scan_id: int) -> List[Dict[str, Any]]:
+    conn = get_connection()
+    with _CONN_LOCK:
+        rows = conn.execute("""
+            SELECT path, sha256, status, risk_score, reasons_json
+            FROM files
+            WHERE scan_id = ?
+            ORDER BY id
+        """, (scan_id,)).fetchall()
+    return [_file_entry(r) for r in rows]
+
+
+def find_by_sha256(sha: str) -> List[Dict[str, Any]]:
+    """
+    Every stored result for a hash, newest scan first.
+    """
+    conn = get_connection()
+    with _CONN_LOCK:
+        rows = conn.execute("""
+            SELECT f.path, f.sha256, f.status, f.risk_score, f.reasons_json,
+                   s.id, s.timestamp, s.target
+            FROM files f
+            JOIN scans s ON s.id = f.scan_id
+            WHERE f.sha256 = ?
+            ORDER BY s.id DESC
+        """, (sha.lower(),)).fetchall()
+    out: List[Dict[str, Any]] = []
+    for row in rows:
+        entry = _file_entry(row[:5])
+        entry.update({"scan_id": row[5], "timestamp": row[6], "target": row[7]})
+        out.append(entry)
+    return out
@@ -0,0 +1,41 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Compact JSON as bytes, through orjson when it is installed.
+
+    Fallback (no orjson, or orjson refuses the value, e.g. a
+    surrogate-escaped path): stdlib json with ASCII escapes, so the
+    encode cannot fail on such strings and the output is plain ASCII.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("ascii")
+
+
+def dumps(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse JSON through orjson when installed, else stdlib json. Also falls
+    back when orjson rejects input the stdlib accepts, such as the lone
+    surrogate escapes dumps_bytes' fallback writes.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
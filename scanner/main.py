@@ -1,81 +1,113 @@
 import argparse
 import json
+import os
+import sys
 import time
 import zipfile
-import tempfile
-import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 
 
 from .utils import (
     iso_now, bool_from_str, normalize_storage,
-    safe_is_file, safe_is_dir, iter_files_in_dir, is_text_like_extension
+    safe_is_file, safe_is_dir, iter_files_in_dir, is_text_like_extension,
+    FileEntry, file_ext
 )
-from .hashing import sha256_file
-from .heuristics import evaluate_heuristics
-from .signatures import load_signatures, update_signatures_from_file, extract_sha256_set
+from .heuristics import VECTORIZED_ENTROPY, NameInfo, evaluate_heuristics, name_info
+from .hashing import open_sequential, sha256_fileobj
+from .streaming import scan_file_streaming, scan_stream
+from .results import ResultColumns, ResultRow, build_result_row
+from .signatures import load_sha256_set, update_signatures_from_file
 from .history_json import append_history as append_history_json, read_history as read_history_json
 from .history_sqlite import append_history as append_history_sqlite, read_history as read_history_sqlite
+from .json_codec import dumps
 
 
-EICAR_STR = b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*"
-
-
-def detect_eicar(path: Path) -> bool:
+def scan_one_file(
+    path: Union[str, Path],
+    heuristics_enabled: bool,
+    sig_set,
+    size: Optional[int] = None,
+    max_hash_size: int = 0,
+    use_mmap: bool = False
+) -> ResultRow:
     """
-    Detect EICAR test string in a safe, read-only way.
-    We scan small-to-moderate text-like files.
+    max_hash_size (bytes, 0 = no limit) skips hashing larger files; they
+    get heuristics only and a note that no signature check was done.
+    use_mmap lets mid-size files be read through a mapping.
     """
-    try:
-        # Guard by extension AND size for safety/perf
-        if not is_text_like_extension(path.suffix.lower()):
-            return False
-
-        size = path.stat().st_size
-        if size > 5 * 1024 * 1024:
-            return False
-
-        with path.open("rb") as f:
-            data = f.read()
-        return EICAR_STR in data
-    except Exception:
-        return False
+    if heuristics_enabled:
+        info = name_info(path)
+        ext = info.ext
+    else:
+        # Hash-and-EICAR scan: only the extension is needed, skip NameInfo
+        info = None
+        ext = file_ext(os.fspath(path))
+
+    # Single read: hash, header, entropy sample and EICAR check together
+    streamed = scan_file_streaming(
+        path,
+        entropy_bytes=1024 * 1024 if heuristics_enabled else 0,
+        check_eicar=is_text_like_extension(ext),
+        size=size,
+        max_hash_size=max_hash_size,
+        use_mmap=use_mmap
+    )
+    return classify_scan(path, info, streamed, heuristics_enabled, sig_set)
 
 
-def build_result_entry(
-    path: Path,
-    sha256: str,
-    status: str,
-    risk_score: int,
-    reasons: List[str]
-) -> Dict:
-    return {
-        "path": str(path),
-        "sha256": sha256 or "",
-        "status": status,
-        "risk_score": int(risk_score),
-        "reasons": reasons or []
-    }
+def scan_one_stream(
+    name: str,
+    fileobj,
+    heuristics_enabled: bool,
+    sig_set,
+    size: Optional[int] = None,
+    max_hash_size: int = 0
+) -> ResultRow:
+    """
+    Scan an already open binary stream (e.g. a ZIP member) in one pass.
+    name is used for the result path and the filename heuristics.
+    Read errors are raised to the caller.
+    """
+    info = name_info(name) if heuristics_enabled else None
+    streamed = scan_stream(
+        fileobj,
+        entropy_bytes=1024 * 1024 if heuristics_enabled else 0,
+        check_eicar=is_text_like_extension(info.ext if info else file_ext(name)),
+        hash_file=not max_hash_size or size is None or size <= max_hash_size
+    )
+    return classify_scan(name, info, streamed, heuristics_enabled, sig_set)
 
 
-def scan_one_file(path: Path, heuristics_enabled: bool, sig_set) -> Dict:
+def classify_scan(
+    path: Union[str, Path],
+    info: Optional[NameInfo],
+    streamed: Optional[Tuple[bytes, bytes, Optional[float], bool]],
+    heuristics_enabled: bool,
+    sig_set
+) -> ResultRow:
+    """
+    Turn the output of a streaming read into a result row.
+    info is only used for heuristics; it may be None when they are off.
+    """
     reasons: List[str] = []
-
-    # Hash
-    sha = sha256_file(path)
-    if sha is None:
-        return build_result_entry(
+    if streamed is None:
+        return build_result_row(
             path, "",
             "heuristic_flag",
             10,
             ["Could not read file (permission or access issue)."]
         )
+    digest, header, ent, eicar_hit = streamed
+    # Raw digest for the lookup, hex only for the report
+    sha = digest.hex()
+    notes = [] if digest else ["File too large to hash; signature check skipped."]
 
     # EICAR test
-    if detect_eicar(path):
-        return build_result_entry(
+    if eicar_hit:
+        return build_result_row(
             path, sha,
             "eicar_test",
             90,
@@ -83,8 +115,8 @@ def scan_one_file(path: Path, heuristics_enabled: bool, sig_set) -> Dict:
         )
 
     # Signature match
-    if sha.lower() in sig_set:
-        return build_result_entry(
+    if digest in sig_set:
+        return build_result_row(
             path, sha,
             "signature_match",
             100,
@@ -93,24 +125,29 @@ def scan_one_file(path: Path, heuristics_enabled: bool, sig_set) -> Dict:
 
     # Heuristics
     if heuristics_enabled:
-        h = evaluate_heuristics(path, enable_entropy=True)
+        h = evaluate_heuristics(
+            path,
+            enable_entropy=True,
+            precomputed={"header": header, "entropy": ent},
+            info=info
+        )
         score = h.get("risk_score", 0)
         reasons = h.get("reasons", []) or []
 
         if score >= 25:
-            return build_result_entry(
+            return build_result_row(
                 path, sha,
                 "heuristic_flag",
                 score,
-                reasons
+                reasons + notes
             )
 
     # Clean
-    return build_result_entry(
+    return build_result_row(
         path, sha,
         "clean",
         0,
-        []
+        notes
     )
 
 
@@ -126,105 +163,232 @@ def read_history(storage: str):
         return read_history_sqlite()
     return read_history_json()
 
-def scan_archive(path: Path, heuristics_enabled: bool, sig_set) -> List[Dict]:
+def scan_archive(
+    path: Union[str, Path],
+    heuristics_enabled: bool,
+    sig_set,
+    max_hash_size: int = 0,
+    use_mmap: bool = False
+) -> Tuple[List[ResultRow], int]:
     """
-    Scan a ZIP/JAR archive by extracting its contents to a temp directory,
-    scanning each extracted file with scan_one_file, and returning a list
-    of result dicts. Nested archives (zip-in-zip) are *not* recursively
-    extracted – they’re flagged heuristically instead.
+    Scan a ZIP/JAR archive by streaming each member through scan_one_stream
+    (nothing is written to disk). Returns (results, files_scanned): the
+    archive counts as one file plus one per scanned member.
+    The archive itself is hashed first on the same descriptor; if it
+    matches a signature, or cannot be opened as a ZIP, that single row is
+    returned and counts as one file.
+    Nested archives (zip-in-zip) are *not* recursively scanned – they’re
+    flagged heuristically instead.
     """
-    results: List[Dict] = []
+    results: List[ResultRow] = []
 
-    # Temp dir inside data dir if possible
     try:
-        from .utils import get_data_dir
-        base_dir = get_data_dir()
-    except Exception:
-        base_dir = Path("data")
-
-    temp_dir = Path(tempfile.mkdtemp(prefix="unpack_", dir=base_dir))
+        f = open_sequential(path)
+    except OSError:
+        results.append(build_result_row(
+            str(path), "",
+            "heuristic_flag",
+            10,
+            ["Could not read file (permission or access issue)."]
+        ))
+        return results, 1
+
+    with f:
+        # Hash the container on the descriptor zipfile will use next, so
+        # its reads come from the page cache this pass just filled
+        size = os.fstat(f.fileno()).st_size
+        if not max_hash_size or size <= max_hash_size:
+            try:
+                archive_digest = sha256_fileobj(f, size, use_mmap)
+            except OSError:
+                archive_digest = b""
+            if archive_digest in sig_set:
+                results.append(build_result_row(
+                    path, archive_digest.hex(),
+                    "signature_match",
+                    100,
+                    ["Offline signature match (educational signature set)."]
+                ))
+                return results, 1
 
-    try:
         try:
-            zf = zipfile.ZipFile(path, "r")
+            zf = zipfile.ZipFile(f, "r")
         except zipfile.BadZipFile:
             # Not a valid ZIP, treat as suspicious
-            results.append({
-                "path": str(path),
-                "sha256": "",
-                "status": "heuristic_flag",
-                "risk_score": 25,
-                "reasons": ["Invalid or corrupted ZIP/JAR archive."]
-            })
-            return results
-
-        for member in zf.namelist():
-            # skip directories
-            if not member or member.endswith("/"):
-                continue
-
-            # Detect nested archives (zip/jar inside zip/jar) and don't recurse
-            lower_name = member.lower()
-            if lower_name.endswith(".zip") or lower_name.endswith(".jar"):
-                results.append({
-                    "path": f"{path}!{member}",
-                    "sha256": "",
-                    "status": "heuristic_flag",
-                    "risk_score": 50,
-                    "reasons": [f"Nested archive '{member}' not extracted (depth limit)."]
-                })
-                continue
-
-            # Extract and scan this file
-            try:
-                extracted_path = temp_dir / member
-                extracted_path.parent.mkdir(parents=True, exist_ok=True)
-                zf.extract(member, path=temp_dir)
-            except Exception as e:
-                results.append({
-                    "path": f"{path}!{member}",
-                    "sha256": "",
-                    "status": "heuristic_flag",
-                    "risk_score": 10,
-                    "reasons": [f"Could not extract '{member}': {e}"]
-                })
-                continue
-
-            # Use normal single-file scan on the extracted file
-            res = scan_one_file(extracted_path, heuristics_enabled, sig_set)
-            # Rewrite path so user sees the archive context
-            res["path"] = f"{path}!{member}"
-            results.append(res)
-
-    finally:
-        # Clean up temp extraction directory
+            results.append(build_result_row(
+                str(path), "",
+                "heuristic_flag",
+                25,
+                ["Invalid or corrupted ZIP/JAR archive."]
+            ))
+            return results, 1
+
+        with zf:
+            results.extend(_scan_zip_members(path, zf, heuristics_enabled, sig_set, max_hash_size))
+    return results, 1 + len(results)  # archive + contents
+
+
+def _scan_zip_members(
+    path: Union[str, Path],
+    zf: zipfile.ZipFile,
+    heuristics_enabled: bool,
+    sig_set,
+    max_hash_size: int = 0
+) -> List[ResultRow]:
+    """
+    Scan every member of an open archive; see scan_archive.
+    """
+    results: List[ResultRow] = []
+    for info in zf.infolist():
+        member = info.filename
+        # skip directories
+        if not member or info.is_dir():
+            continue
+
+        # Detect nested archives (zip/jar inside zip/jar) and don't recurse
+        lower_name = member.lower()
+        if lower_name.endswith(".zip") or lower_name.endswith(".jar"):
+            results.append(build_result_row(
+                f"{path}!{member}", "",
+                "heuristic_flag",
+                50,
+                [f"Nested archive '{member}' not extracted (depth limit)."]
+            ))
+            continue
+
+        # Decompress and scan this member in a single pass
         try:
-            shutil.rmtree(temp_dir)
-        except OSError:
-            pass
+            with zf.open(info) as src:
+                res = scan_one_stream(
+                    member, src, heuristics_enabled, sig_set,
+                    size=info.file_size,
+                    max_hash_size=max_hash_size
+                )
+        except Exception as e:
+            results.append(build_result_row(
+                f"{path}!{member}", "",
+                "heuristic_flag",
+                10,
+                [f"Could not extract '{member}': {e}"]
+            ))
+            continue
+
+        # Rewrite path so user sees the archive context
+        results.append(res._replace(path=f"{path}!{member}"))
 
     return results
 
-def scan_target_file(path: Path, heuristics_enabled: bool, storage: str) -> Dict:
+
+# ProcessPoolExecutor refuses more than 61 workers on Windows
+# (WaitForMultipleObjects handle limit)
+MAX_PROCESS_WORKERS = 61 if sys.platform == "win32" else None
+
+
+def process_workers(jobs: int) -> int:
+    if MAX_PROCESS_WORKERS is not None:
+        return min(jobs, MAX_PROCESS_WORKERS)
+    return jobs
+
+
+def default_jobs(use_processes: bool = False) -> int:
+    if use_processes:
+        return process_workers(os.cpu_count() or 1)
+    # Scanning is I/O-bound and hashlib releases the GIL, so oversubscribe
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+# Entropy input (bytes, at most 1 MiB per file) below which "auto" stays on
+# threads: starting a process pool (spawn on Windows) costs more than the
+# GIL-bound entropy loop saves on smaller scans
+AUTO_PROCESS_MIN_BYTES = 64 * 1024 * 1024
+
+
+def want_processes(
+    executor: str,
+    heuristics_enabled: bool,
+    files: Sequence[FileEntry] = ()
+) -> bool:
+    """
+    "auto" picks processes only when the pure-Python entropy loop would
+    hold the GIL (heuristics on, no NumPy) and the files give it at least
+    AUTO_PROCESS_MIN_BYTES to sample; hashing alone is fine on threads.
+    """
+    if executor == "process":
+        return True
+    if executor == "thread":
+        return False
+    if not heuristics_enabled or VECTORIZED_ENTROPY:
+        return False
+    sampled = 0
+    for f in files:
+        sampled += min(f.size, 1024 * 1024)
+        if sampled >= AUTO_PROCESS_MIN_BYTES:
+            return True
+    return False
+
+
+# Per-process scan settings, set once by the pool initializer so the
+# signature set is not pickled with every task
+_worker_args: Tuple = ()
+
+
+def _init_scan_worker(
+    heuristics_enabled: bool,
+    sig_set,
+    max_hash_size: int,
+    use_mmap: bool
+) -> None:
+    global _worker_args
+    _worker_args = (heuristics_enabled, sig_set, max_hash_size, use_mmap)
+
+
+def _scan_entry_in_worker(f: FileEntry) -> Tuple[List[ResultRow], int]:
+    heuristics_enabled, sig_set, max_hash_size, use_mmap = _worker_args
+    return scan_dir_entry(f.path, heuristics_enabled, sig_set, f.size, max_hash_size, use_mmap)
+
+
+def scan_dir_entry(
+    path: str,
+    heuristics_enabled: bool,
+    sig_set,
+    size: Optional[int] = None,
+    max_hash_size: int = 0,
+    use_mmap: bool = False
+) -> Tuple[List[ResultRow], int]:
+    """
+    Scan one file yielded by the directory walk.
+    Returns (results, files_scanned) so archives can count their members.
+    """
+    if file_ext(path) in (".zip", ".jar"):
+        return scan_archive(path, heuristics_enabled, sig_set, max_hash_size, use_mmap)
+    return [scan_one_file(path, heuristics_enabled, sig_set, size, max_hash_size, use_mmap)], 1
+
+
+def scan_target_file(
+    path: Path,
+    heuristics_enabled: bool,
+    storage: str,
+    max_hash_size: int = 0
+) -> Dict:
     start_time = time.time()
 
-    sig_obj = load_signatures()
-    sig_set = extract_sha256_set(sig_obj)
+    sig_set = load_sha256_set()
 
-    results: List[Dict] = []
+    results = ResultColumns()
 
     # If this is an archive, scan its contents instead of treating it as a normal file
+    # One file: mapping it is worth the (small) truncation risk
     if path.suffix.lower() in (".zip", ".jar"):
-        inner_results = scan_archive(path, heuristics_enabled, sig_set)
+        inner_results, files_scanned = scan_archive(
+            path, heuristics_enabled, sig_set, max_hash_size, use_mmap=True
+        )
         results.extend(inner_results)
-        # Count the archive itself + the inner entries
-        files_scanned = 1 + len(inner_results)
     else:
-        entry = scan_one_file(path, heuristics_enabled, sig_set)
+        entry = scan_one_file(path, heuristics_enabled, sig_set, max_hash_size=max_hash_size, use_mmap=True)
         results.append(entry)
         files_scanned = 1
 
-    flagged = sum(1 for r in results if r.get("status") != "clean")
+    flagged = results.flagged()
 
     end_time = time.time()
     duration = round(end_time - start_time, 2)
@@ -240,13 +404,31 @@ def scan_target_file(path: Path, heuristics_enabled: bool, storage: str) -> Dict
             "flagged": flagged
         },
         "duration": duration,
-        "results": results
+        "results": results.to_dicts()
     }
 
     persist_history(storage, report)
     return report
 
-def scan_target_dir(path: Path, recursive: bool, heuristics_enabled: bool, storage: str) -> Dict:
+def scan_target_dir(
+    path: Path,
+    recursive: bool,
+    heuristics_enabled: bool,
+    storage: str,
+    jobs: int = 0,
+    on_result: Optional[Callable[[Dict], None]] = None,
+    max_hash_size: int = 0,
+    executor: str = "auto",
+    use_mmap: bool = False
+) -> Dict:
+    """
+    on_result, if given, is called with each result entry in walk order
+    as soon as it is available (used for --ndjson streaming); the report
+    still carries every result, since history persists it whole.
+    executor is "thread", "process" or "auto" (see want_processes).
+    use_mmap maps mid-size files; off by default because a file truncated
+    during the walk would kill the scan with SIGBUS (see mmap_window).
+    """
     start_time = time.time()
 
     # Load exclusions from settings.json (if present)
@@ -271,10 +453,9 @@ def scan_target_dir(path: Path, recursive: bool, heuristics_enabled: bool, stora
     except Exception:
         exclude_patterns = []
 
-    sig_obj = load_signatures()
-    sig_set = extract_sha256_set(sig_obj)
+    sig_set = load_sha256_set()
 
-    results: List[Dict] = []
+    results = ResultColumns()
     files_scanned = 0
 
     try:
@@ -283,18 +464,37 @@ def scan_target_dir(path: Path, recursive: bool, heuristics_enabled: bool, stora
         # Fallback for older iter_files_in_dir signature without excludes
         file_iter = iter_files_in_dir(path, recursive=recursive)
 
-    for f in file_iter:
-        # Archive handling
-        if f.suffix.lower() in (".zip", ".jar"):
-            inner_results = scan_archive(f, heuristics_enabled, sig_set)
-            results.extend(inner_results)
-            files_scanned += 1 + len(inner_results)  # archive + contents
-        else:
-            entry = scan_one_file(f, heuristics_enabled, sig_set)
-            results.append(entry)
-            files_scanned += 1
+    files = list(file_iter)
+    use_processes = want_processes(executor, heuristics_enabled, files)
+    jobs = jobs if jobs > 0 else default_jobs(use_processes)
+
+    def scan(f: FileEntry) -> Tuple[List[ResultRow], int]:
+        return scan_dir_entry(f.path, heuristics_enabled, sig_set, f.size, max_hash_size, use_mmap)
+
+    def collect(scanned) -> None:
+        nonlocal files_scanned
+        for entries, count in scanned:
+            results.extend(entries)
+            files_scanned += count
+            if on_result is not None:
+                for entry in entries:
+                    on_result(entry.as_dict())
+
+    if jobs == 1 or len(files) <= 1:
+        collect(map(scan, files))
+    elif use_processes:
+        # ex.map keeps results in walk order; chunksize batches the IPC
+        with ProcessPoolExecutor(
+            max_workers=process_workers(min(jobs, len(files))),
+            initializer=_init_scan_worker,
+            initargs=(heuristics_enabled, sig_set, max_hash_size, use_mmap)
+        ) as ex:
+            collect(ex.map(_scan_entry_in_worker, files, chunksize=8))
+    else:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(files))) as ex:
+            collect(ex.map(scan, files))
 
-    flagged = sum(1 for r in results if r.get("status") != "clean")
+    flagged = results.flagged()
 
     end_time = time.time()
     duration = round(end_time - start_time, 2)
@@ -310,7 +510,7 @@ def scan_target_dir(path: Path, recursive: bool, heuristics_enabled: bool, stora
             "flagged": flagged
         },
         "duration": duration,
-        "results": results
+        "results": results.to_dicts()
     }
 
     persist_history(storage, report)
@@ -319,14 +519,14 @@ def scan_target_dir(path: Path, recursive: bool, heuristics_enabled: bool, stora
 
 
 def json_ok(payload: Dict) -> None:
-    print(json.dumps(payload, ensure_ascii=False))
+    print(dumps(payload))
 
 
 def json_error(message: str, code: str = "error", extra: Dict = None) -> None:
     out = {"error": {"code": code, "message": message}}
     if extra:
         out["error"].update(extra)
-    print(json.dumps(out, ensure_ascii=False))
+    print(dumps(out))
 
 
 def main():
@@ -337,12 +537,26 @@ def main():
     p_file.add_argument("--path", required=True)
     p_file.add_argument("--heuristics", default="true")
     p_file.add_argument("--storage", default="json")
+    p_file.add_argument("--max-hash-size", type=int, default=0,
+                        help="Skip hashing files larger than this many bytes (0 = no limit)")
 
     p_dir = sub.add_parser("scan-dir", help="Scan a directory")
     p_dir.add_argument("--path", required=True)
     p_dir.add_argument("--recursive", default="true")
     p_dir.add_argument("--heuristics", default="true")
     p_dir.add_argument("--storage", default="json")
+    p_dir.add_argument("--jobs", type=int, default=0, help="Workers (0 = auto)")
+    p_dir.add_argument("--executor", choices=("auto", "thread", "process"), default="auto",
+                       help="Worker type; auto uses processes only for large pure-Python entropy scans")
+    p_dir.add_argument("--max-hash-size", type=int, default=0,
+                       help="Skip hashing files larger than this many bytes (0 = no limit)")
+    p_dir.add_argument("--mmap", action="store_true",
+                       help="Map mid-size files instead of reading them (a file truncated "
+                            "during the scan then crashes it with SIGBUS)")
+    p_dir.add_argument("--ndjson", action="store_true",
+                       help="Print one result per line as scanned, then the report without results "
+                            "(results appear sooner; memory use is unchanged, the full report "
+                            "is still built for history)")
 
     p_up = sub.add_parser("update-signatures", help="Offline signature update")
     p_up.add_argument("--file", required=True)
@@ -363,7 +577,7 @@ def main():
             heur = bool_from_str(args.heuristics, default=True)
             storage = normalize_storage(args.storage)
 
-            report = scan_target_file(target, heur, storage)
+            report = scan_target_file(target, heur, storage, max_hash_size=args.max_hash_size)
             json_ok(report)
             return
 
@@ -378,7 +592,20 @@ def main():
             heur = bool_from_str(args.heuristics, default=True)
             storage = normalize_storage(args.storage)
 
-            report = scan_target_dir(target, recursive, heur, storage)
+            if args.ndjson:
+                report = scan_target_dir(
+                    target, recursive, heur, storage, jobs=args.jobs,
+                    on_result=json_ok, max_hash_size=args.max_hash_size,
+                    executor=args.executor, use_mmap=args.mmap
+                )
+                json_ok({k: v for k, v in report.items() if k != "results"})
+                return
+
+            report = scan_target_dir(
+                target, recursive, heur, storage,
+                jobs=args.jobs, max_hash_size=args.max_hash_size,
+                executor=args.executor, use_mmap=args.mmap
+            )
             json_ok(report)
             return
 
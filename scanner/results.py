@@ -0,0 +1,82 @@
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Union
+
+
+def build_result_entry(
+    path: Union[Path, str],
+    sha256: str,
+    status: str,
+    risk_score: int,
+    reasons: List[str]
+) -> Dict:
+    return {
+        "path": str(path),
+        "sha256": sha256 or "",
+        "status": status,
+        "risk_score": int(risk_score),
+        "reasons": reasons or []
+    }
+
+
+class ResultRow(NamedTuple):
+    """
+    One scanned file, kept as a plain tuple until the report is built.
+    """
+    path: str
+    sha256: str
+    status: str
+    risk_score: int
+    reasons: List[str]
+
+    def as_dict(self) -> Dict:
+        return build_result_entry(*self)
+
+
+def build_result_row(
+    path: Union[Path, str],
+    sha256: str,
+    status: str,
+    risk_score: int,
+    reasons: List[str]
+) -> ResultRow:
+    return ResultRow(str(path), sha256 or "", status, int(risk_score), reasons or [])
+
+
+class ResultColumns:
+    """
+    Column-wise store for a scan's results: one list per field and an
+    int array for scores. Dicts are only built by to_dicts().
+    """
+
+    __slots__ = ("paths", "shas", "statuses", "scores", "reasons")
+
+    def __init__(self) -> None:
+        self.paths: List[str] = []
+        self.shas: List[str] = []
+        self.statuses: List[str] = []
+        self.scores = array("i")
+        self.reasons: List[List[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def append(self, row: ResultRow) -> None:
+        self.paths.append(row.path)
+        self.shas.append(row.sha256)
+        self.statuses.append(row.status)
+        self.scores.append(row.risk_score)
+        self.reasons.append(row.reasons)
+
+    def extend(self, rows: Iterable[ResultRow]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def flagged(self) -> int:
+        return sum(1 for s in self.statuses if s != "clean")
+
+    def to_dicts(self) -> List[Dict]:
+        return [
+            build_result_entry(*fields)
+            for fields in zip(self.paths, self.shas, self.statuses, self.scores, self.reasons)
+        ]
@@ -1,7 +1,12 @@
+import functools
 import json
+import os
+import struct
+import tempfile
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
+from .json_codec import dumps_bytes
 from .utils import get_data_dir
 
 
@@ -51,6 +56,93 @@ def extract_sha256_set(sig_obj: Dict) -> Set[str]:
     return out
 
 
+def extract_sha256_digests(sig_obj: Dict) -> FrozenSet[bytes]:
+    """
+    Like extract_sha256_set, but as raw 32-byte digests for lookups.
+    Entries that are not valid hex are skipped.
+    """
+    out = set()
+    for h in extract_sha256_set(sig_obj):
+        try:
+            out.add(bytes.fromhex(h))
+        except ValueError:
+            continue
+    return frozenset(out)
+
+
+def digest_cache_path() -> Path:
+    return get_data_dir() / "signatures.cache"
+
+
+# signatures.cache: signatures.json's (mtime_ns, size), then the digests
+# back to back, 32 bytes each. Plain bytes rather than a pickle, so a
+# tampered cache can at worst yield wrong hashes, never run code.
+_CACHE_HEADER = struct.Struct("<qq")
+
+
+def _read_digest_cache(mtime_ns: int, size: int) -> Optional[FrozenSet[bytes]]:
+    try:
+        data = digest_cache_path().read_bytes()
+    except OSError:
+        return None
+    hsize = _CACHE_HEADER.size
+    if len(data) < hsize or (len(data) - hsize) % 32:
+        return None
+    if _CACHE_HEADER.unpack_from(data) != (mtime_ns, size):
+        return None
+    return frozenset(data[i:i + 32] for i in range(hsize, len(data), 32))
+
+
+def _write_digest_cache(mtime_ns: int, size: int, digests: FrozenSet[bytes]) -> None:
+    # Unique temp name so concurrent scans never write the same file
+    p = digest_cache_path()
+    try:
+        fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=p.name + ".")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_CACHE_HEADER.pack(mtime_ns, size) + b"".join(digests))
+        os.replace(tmp, p)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_sha256_set(path_str: str, mtime_ns: int, size: int) -> FrozenSet[bytes]:
+    # Arguments are only the cache key; the file is always signatures_path()
+    digests = _read_digest_cache(mtime_ns, size)
+    if digests is None:
+        digests = extract_sha256_digests(load_signatures())
+        _write_digest_cache(mtime_ns, size, digests)
+    return digests
+
+
+def load_sha256_set() -> FrozenSet[bytes]:
+    """
+    Signature hashes as raw 32-byte digests (compare against
+    hashlib's digest(), not hexdigest()), re-parsed only when
+    signatures.json changes. A cache hit costs one stat() of the file;
+    a new process reads the digests from signatures.cache instead of
+    parsing the JSON, as long as mtime and size still match.
+    """
+    p = signatures_path()
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        ensure_default_signatures()
+        try:
+            st = p.stat()
+        except OSError:
+            return extract_sha256_digests(load_signatures())
+    except OSError:
+        return extract_sha256_digests(load_signatures())
+    return _cached_sha256_set(str(p), st.st_mtime_ns, st.st_size)
+
+
 def validate_signature_schema(obj: Dict) -> Tuple[bool, str]:
     if not isinstance(obj, dict):
         return False, "Signature file root must be an object."
@@ -70,14 +162,28 @@ def validate_signature_schema(obj: Dict) -> Tuple[bool, str]:
         if not isinstance(h, str) or len(h) != 64:
             return False, "Each sha256 hash must be a 64-character hex string."
 
+    # One fromhex over the whole list checks every digit in C. fromhex
+    # skips whitespace, so a short result means a hash contained some.
+    try:
+        valid_hex = len(bytes.fromhex("".join(sha_list))) == 32 * len(sha_list)
+    except ValueError:
+        valid_hex = False
+    if not valid_hex:
+        return False, "Each sha256 hash must be a 64-character hex string."
+
     return True, "ok"
 
 
-def merge_signatures(existing: Dict, incoming: Dict) -> Dict:
+def merge_signatures(existing: Dict, incoming: Dict) -> Tuple[Dict, Set[str], Set[str]]:
+    """
+    Returns (merged_signatures, existing_hashes, merged_hashes) so callers
+    can count without extracting the hash sets again.
+    """
     existing_set = extract_sha256_set(existing)
     incoming_set = extract_sha256_set(incoming)
 
-    merged = sorted(existing_set.union(incoming_set))
+    merged_set = existing_set.union(incoming_set)
+    merged = sorted(merged_set)
     out = {
         "version": str(incoming.get("version", existing.get("version", "1.0"))),
         "updated": str(incoming.get("updated", existing.get("updated", ""))),
@@ -91,7 +197,7 @@ def merge_signatures(existing: Dict, incoming: Dict) -> Dict:
     if isinstance(inc_notes, str) and inc_notes.strip():
         out["hashes"]["notes"] = inc_notes.strip()
 
-    return out
+    return out, existing_set, merged_set
 
 
 def update_signatures_from_file(local_path: Path) -> Dict:
@@ -105,13 +211,13 @@ def update_signatures_from_file(local_path: Path) -> Dict:
     if not ok:
         raise ValueError(msg)
 
-    merged = merge_signatures(existing, incoming)
-    signatures_path().write_text(json.dumps(merged, indent=2), encoding="utf8")
+    merged, existing_set, merged_set = merge_signatures(existing, incoming)
+    # Compact, written in one go; large sets make indent=2 noticeably slower
+    signatures_path().write_bytes(dumps_bytes(merged))
 
-    added = len(extract_sha256_set(merged)) - len(extract_sha256_set(existing))
     return {
-        "added": added,
-        "total": len(extract_sha256_set(merged)),
+        "added": len(merged_set) - len(existing_set),
+        "total": len(merged_set),
         "version": merged.get("version"),
         "updated": merged.get("updated")
     }
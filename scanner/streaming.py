@@ -0,0 +1,145 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
+
+from .hashing import USE_FILE_DIGEST, open_sequential, read_buffer
+from .heuristics import byte_histogram, entropy_from_counts
+from .utils import MMAP_MAX_SIZE, MMAP_MIN_SIZE, mmap_window
+
+
+EICAR_STR = b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*"
+
+HEADER_SIZE = 16
+
+
+def _scan_mapped(
+    f: BinaryIO,
+    entropy_bytes: int,
+    check_eicar: bool
+) -> Optional[Tuple[bytes, bytes, Optional[float], bool]]:
+    """
+    scan_file_streaming over a read-only mapping: the hash, entropy
+    sample and EICAR search all work on the page cache without copies.
+    Only reached with use_mmap (scan-file, or scan-dir --mmap); default
+    tree walks search for EICAR chunk by chunk in scan_stream instead.
+    Returns None if the file cannot be mapped.
+    """
+    # Length 0 maps the whole file as it is now, even if it changed
+    # since the caller looked at its size
+    with mmap_window(f, 0) as mv:
+        if mv is None:
+            return None
+        h = hashlib.sha256(mv)
+        header = bytes(mv[:HEADER_SIZE])
+        ent = None
+        if entropy_bytes:
+            sample = mv[:entropy_bytes]
+            ent = entropy_from_counts(byte_histogram(sample), len(sample))
+            sample.release()
+        # mv.obj is the mmap itself; its find() scans in place
+        eicar_hit = check_eicar and mv.obj.find(EICAR_STR) != -1
+    return h.digest(), header, ent, eicar_hit
+
+
+def scan_stream(
+    f: BinaryIO,
+    entropy_bytes: int = 1024 * 1024,
+    check_eicar: bool = True,
+    hash_file: bool = True
+) -> Tuple[bytes, bytes, Optional[float], bool]:
+    """
+    One pass over an open binary stream (a file or an archive member):
+    returns (sha256_digest, header, entropy, eicar_hit) like scan_file_streaming.
+    Read errors are raised to the caller.
+
+    With hash_file False, sha256_digest is b"" and reading stops after the
+    header/entropy window.
+    """
+    h = hashlib.sha256()
+    buf = read_buffer()
+    mv = memoryview(buf)
+    tail_len = len(EICAR_STR) - 1
+    window = max(entropy_bytes, HEADER_SIZE)
+
+    header = b""
+    counts = None
+    sampled = 0
+    eicar_hit = False
+    tail = b""
+    total = 0
+
+    while True:
+        if not hash_file and total >= window:
+            break
+        n = f.readinto(buf)
+        if not n:
+            break
+        total += n
+        if hash_file:
+            h.update(mv[:n])
+
+        if len(header) < HEADER_SIZE:
+            header += bytes(mv[:min(n, HEADER_SIZE - len(header))])
+
+        if sampled < entropy_bytes:
+            take = min(n, entropy_bytes - sampled)
+            counts = byte_histogram(mv[:take], counts)
+            sampled += take
+
+        if check_eicar and not eicar_hit:
+            # Matches straddling the previous chunk boundary first
+            if tail and (tail + bytes(mv[:min(n, tail_len)])).find(EICAR_STR) != -1:
+                eicar_hit = True
+            elif buf.find(EICAR_STR, 0, n) != -1:
+                eicar_hit = True
+            tail = (tail + bytes(mv[max(0, n - tail_len):n]))[-tail_len:]
+
+    ent = entropy_from_counts(counts, sampled) if entropy_bytes else None
+    return (h.digest() if hash_file else b""), header, ent, eicar_hit
+
+
+def scan_file_streaming(
+    path: Union[str, Path],
+    entropy_bytes: int = 1024 * 1024,
+    check_eicar: bool = True,
+    size: Optional[int] = None,
+    max_hash_size: int = 0,
+    use_mmap: bool = False
+) -> Optional[Tuple[bytes, bytes, Optional[float], bool]]:
+    """
+    Read a file once and derive everything scan_one_file needs from it.
+
+    Returns (sha256_digest, header, entropy, eicar_hit) or None on failure;
+    the digest is the raw 32 bytes, as stored in load_sha256_set().
+    entropy covers the first entropy_bytes only (None when entropy_bytes is 0).
+    With use_mmap, files between MMAP_MIN_SIZE and MMAP_MAX_SIZE are
+    mapped and searched in place (see mmap_window for the truncation
+    risk); otherwise all files are streamed and EICAR is searched in each
+    read buffer. Pass size if already known to skip the fstat.
+
+    Files over max_hash_size (0 = no limit) are not hashed: sha256_digest
+    is b"" and only the header/entropy window is read (EICAR within it).
+    """
+    try:
+        with open_sequential(path) as f:
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+            hash_file = not max_hash_size or size <= max_hash_size
+
+            if use_mmap and hash_file and MMAP_MIN_SIZE <= size <= MMAP_MAX_SIZE:
+                mapped = _scan_mapped(f, entropy_bytes, check_eicar)
+                if mapped is not None:
+                    return mapped
+
+            if hash_file and not entropy_bytes and not check_eicar and USE_FILE_DIGEST:
+                # Hash-only scan: let file_digest drive the reads in C
+                header = f.read(HEADER_SIZE)
+                f.seek(0)
+                return hashlib.file_digest(f, "sha256").digest(), header, None, False
+
+            return scan_stream(f, entropy_bytes, check_eicar, hash_file)
+    except (PermissionError, FileNotFoundError, IsADirectoryError):
+        return None
+    except Exception:
+        return None
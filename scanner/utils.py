@@ -1,8 +1,18 @@
 import os
+import mmap
 import fnmatch
+import re
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Iterator, Optional, Tuple, List
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple, List
+
+
+# Below this, a plain read() is cheaper than setting up a mapping
+MMAP_MIN_SIZE = 64 * 1024
+
+# Above this, stream through a buffer instead of mapping the whole file
+MMAP_MAX_SIZE = 256 * 1024 * 1024
 
 
 def get_base_dir() -> Path:
@@ -20,6 +30,37 @@ def iso_now() -> str:
     return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
 
+class FileEntry(NamedTuple):
+    path: str
+    size: int
+
+
+@contextmanager
+def mmap_window(f: BinaryIO, length: int) -> Iterator[Optional[memoryview]]:
+    """
+    Map the first length bytes of an open file read-only (0 = whole file)
+    and yield a memoryview of them, or None if the file cannot be mapped.
+    The view must not be kept past the with block.
+
+    If another process truncates the file while it is mapped, touching
+    the lost pages raises SIGBUS and kills the process; Python cannot
+    catch it. Tree walks therefore only map files when asked to (--mmap).
+    """
+    try:
+        mm = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        yield None
+        return
+    try:
+        with memoryview(mm) as mv:
+            yield mv
+    finally:
+        try:
+            mm.close()
+        except (OSError, BufferError):
+            pass
+
+
 def safe_is_file(p: Path) -> bool:
     try:
         return p.is_file()
@@ -38,7 +79,13 @@ def iter_files_in_dir(
     directory: Path,
     recursive: bool = True,
     excludes: Optional[List[str]] = None
-) -> Iterator[Path]:
+) -> Iterator[FileEntry]:
+    """
+    Yields FileEntry(path, size) for regular files (symlinks to files
+    included, symlinked directories not descended), like os.walk.
+    The size comes from the DirEntry, so callers need no extra stat();
+    path is the DirEntry's str path, no Path object is built per file.
+    """
     if not safe_is_dir(directory):
         return
 
@@ -50,48 +97,54 @@ def iter_files_in_dir(
         if str(p).strip()
     ]
 
-    def is_excluded(p: Path) -> bool:
-        s = p.as_posix().lower()
-        for pat in norm_patterns:
-            if not pat:
-                continue
-            # If pattern has glob chars, use fnmatch
-            if any(ch in pat for ch in "*?[]"):
-                if fnmatch(s, pat):
-                    return True
-            else:
-                # Treat as prefix: exclude everything under that path
-                if s.startswith(pat):
-                    return True
-        return False
+    # Glob patterns become one compiled alternation; the rest are path
+    # prefixes (exclude everything under that path), tested in one call
+    glob_pats = [pat for pat in norm_patterns if pat and any(ch in pat for ch in "*?[]")]
+    prefixes = tuple(pat for pat in norm_patterns if pat and pat not in glob_pats)
+    glob_re = re.compile("|".join(fnmatch.translate(pat) for pat in glob_pats)) if glob_pats else None
+
+    def is_excluded(p: str) -> bool:
+        # Works on DirEntry.path directly, no Path object per entry
+        if not norm_patterns:
+            return False
+        s = p.replace(os.sep, "/").lower()
+        if glob_re is not None and glob_re.match(s):
+            return True
+        return bool(prefixes) and s.startswith(prefixes)
 
     try:
-        if recursive:
-            for root, dirs, files in os.walk(directory):
-                root_path = Path(root)
-
-                # Optionally prune directories based on exclusions
-                dirs[:] = [
-                    d for d in dirs
-                    if not is_excluded(root_path / d)
-                ]
-
-                for f in files:
-                    file_path = root_path / f
-                    if not safe_is_file(file_path):
+        # str(Path(...)) normalizes the root like the old Path-based walk
+        # ("./sub/" -> "sub"); children of "." are joined as bare names
+        # so paths read "x", not "./x", in exclusions and reports
+        stack = [str(Path(directory))]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                # Unreadable directory: skip it, keep walking the rest
+                continue
+
+            at_dot = current == "."
+            subdirs = []
+            for entry in entries:
+                path = entry.name if at_dot else entry.path
+                try:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        # Optionally prune directories based on exclusions
+                        if not is_excluded(path):
+                            subdirs.append(path)
                         continue
-                    if is_excluded(file_path):
+                    if not entry.is_file() or is_excluded(path):
                         continue
-                    yield file_path
-        else:
-            for child in directory.iterdir():
-                if not safe_is_file(child):
-                    continue
-                if is_excluded(child):
+                    size = entry.stat().st_size
+                except OSError:
                     continue
-                yield child
-    except PermissionError:
-        return
+                yield FileEntry(path, size)
+
+            # Reversed so subdirectories are walked in listing order
+            stack.extend(reversed(subdirs))
     except Exception:
         return
 
@@ -119,10 +172,24 @@ def split_name_extensions(filename: str) -> Tuple[str, str]:
     return p.stem.lower(), p.suffix.lower()
 
 
+def file_ext(path: str) -> str:
+    """
+    Lowercased extension of a path string, same rules as Path.suffix
+    ("" for ".bashrc" or "name."), without building a Path.
+    """
+    start = path.rfind("/") + 1
+    if os.sep != "/":
+        start = max(start, path.rfind(os.sep) + 1)
+    i = path.rfind(".", start)
+    if start < i < len(path) - 1:
+        return path[i:].lower()
+    return ""
+
+
 def has_double_extension(filename: str) -> bool:
-    parts = filename.lower().split(".")
-    # At least 3 parts means name.ext1.ext2
-    return len(parts) >= 3
+    # Two or more dots means name.ext1.ext2; found without splitting
+    i = filename.rfind(".")
+    return i > 0 and filename.rfind(".", 0, i) != -1
 
 
 def is_text_like_extension(ext: str) -> bool: